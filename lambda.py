@@ -2,25 +2,60 @@
 # 🚀 AWS LAMBDA EXCEL MAPPER - ENTERPRISE SERVERLESS SOLUTION 
 # ═══════════════════════════════════════════════════════════════════════════════
 
+from __future__ import annotations
+
 import json
+import csv
 import boto3
+from botocore.config import Config
+from boto3.s3.transfer import TransferConfig
 import uuid
 import logging
-import pandas as pd
-import numpy as np
+import importlib.metadata
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional, Tuple, Union
-import tempfile
+from typing import TYPE_CHECKING, Dict, Any, BinaryIO, List, Optional, Set, Tuple, Union
 import os
+import sys
 import io
+import time
 import base64
-from rapidfuzz import fuzz, distance
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, PatternFill
-import traceback
+import hashlib
+import tempfile
+import itertools
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
+from rapidfuzz import fuzz, distance, utils
+from rapidfuzz.process import cdist, extractOne
 from decimal import Decimal
 
+# pandas and numpy are imported inside the functions that use them, so cold starts that
+# only route, ping or touch DynamoDB never load them; annotations resolve for type checkers
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+try:
+    import ahocorasick
+except ImportError:  # Optional: formula rules fall back to pandas substring search
+    ahocorasick = None
+
+try:
+    import orjson
+except ImportError:  # Optional: responses fall back to the stdlib json encoder
+    orjson = None
+
+try:
+    import xlsxwriter
+except ImportError:  # Optional: Excel downloads fall back to openpyxl's write-only workbook
+    xlsxwriter = None
+
+try:
+    import python_calamine  # noqa: F401
+except ImportError:  # Optional: Excel reads fall back to openpyxl
+    python_calamine = None
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # 🔧 SHARED CONFIGURATION & UTILITIES
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -31,10 +66,22 @@ S3_BUCKET_UPLOADS = os.environ.get('S3_BUCKET_UPLOADS', 'excel-mapper-uploads')
 S3_BUCKET_PROCESSED = os.environ.get('S3_BUCKET_PROCESSED', 'excel-mapper-processed')
 S3_BUCKET_TEMPLATES = os.environ.get('S3_BUCKET_TEMPLATES', 'excel-mapper-templates')
 
+# Shared across warm invocations so independent S3 calls overlap without per-request thread startup
+S3_POOL_WORKERS = 8
+s3_pool = ThreadPoolExecutor(max_workers=S3_POOL_WORKERS)
+
 # Initialize AWS clients with error handling
 try:
-    s3_client = boto3.client('s3', region_name=AWS_REGION)
-    dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
+    s3_client = boto3.client(
+        's3',
+        region_name=AWS_REGION,
+        config=Config(max_pool_connections=64, retries={'mode': 'standard'}, tcp_keepalive=True)
+    )
+    dynamodb = boto3.resource(
+        'dynamodb',
+        region_name=AWS_REGION,
+        config=Config(max_pool_connections=50, retries={'mode': 'adaptive', 'max_attempts': 10}, tcp_keepalive=True)
+    )
     
     # DynamoDB table references
     sessions_table = dynamodb.Table('ExcelMapper_Sessions')
@@ -43,9 +90,45 @@ try:
     processing_jobs_table = dynamodb.Table('ExcelMapper_ProcessingJobs')
     
 except Exception as e:
-    logging.error(f"Failed to initialize AWS clients: {e}")
+    logging.error("Failed to initialize AWS clients: %s", e)
     raise
 
+# Sub-rule count at which formula matching switches to an Aho-Corasick automaton
+AHOCORASICK_MIN_PATTERNS = 8
+
+# Parsed client sheets are snapshotted here; /tmp survives across warm invocations
+CLIENT_FRAME_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'excel-mapper-frames')
+CLIENT_FRAME_CACHE_MAX_FILES = 32
+
+# Processed exports go up in 8 MB multipart chunks
+PROCESSED_UPLOAD_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    use_threads=True
+)
+
+# DynamoDB BatchGetItem accepts at most 100 keys per request
+DYNAMODB_BATCH_GET_SIZE = 100
+DYNAMODB_BATCH_GET_RETRIES = 5
+
+# S3 DeleteObjects accepts at most 1000 keys per request
+S3_DELETE_BATCH_SIZE = 1000
+S3_CLEANUP_WORKERS = 16
+
+# Rust-based calamine reader when available (pandas >= 2.2), openpyxl otherwise
+EXCEL_READ_ENGINE = (
+    'calamine'
+    if python_calamine is not None and tuple(int(p) for p in importlib.metadata.version('pandas').split('.')[:2]) >= (2, 2)
+    else 'openpyxl'
+)
+
+# In-memory results reused by warm invocations of the same container.
+# A template save only clears the list in the container that handled it; other
+# warm containers keep serving their copy for up to TEMPLATE_LIST_CACHE_TTL seconds
+MEMORY_CACHE_MAX_ENTRIES = 64
+TEMPLATE_LIST_CACHE_TTL = float(os.environ.get('TEMPLATE_LIST_CACHE_TTL', '30'))
+memory_cache: Dict[str, Tuple[float, Any]] = {}
+
 # Logging configuration
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -59,26 +142,93 @@ CORS_HEADERS = {
 
 def lambda_response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
     """Standard Lambda response format with CORS headers"""
+    if orjson is not None:
+        body_json = orjson.dumps(
+            body, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        ).decode('utf-8')
+    else:
+        body_json = json.dumps(body, default=str)
+    
     return {
         'statusCode': status_code,
         'headers': CORS_HEADERS,
-        'body': json.dumps(body, default=str)
+        'body': body_json,
+        'isBase64Encoded': False
     }
 
+# Serialized once; router error paths return a copy without re-encoding
+NOT_FOUND_RESPONSE = lambda_response(404, {'error': 'Endpoint not found'})
+BAD_REQUEST_RESPONSE = lambda_response(400, {'error': 'Malformed request event'})
+METHOD_NOT_ALLOWED_RESPONSE = lambda_response(405, {'error': 'Method not allowed'})
+INTERNAL_ERROR_RESPONSE = lambda_response(500, {'error': 'Internal server error'})
+
+def parse_json(data: Union[str, bytes]) -> Any:
+    """Parse a JSON request payload with orjson when available, otherwise the stdlib parser"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def is_csv_filename(filename: Optional[str]) -> bool:
+    """Whether an original upload filename refers to a CSV file"""
+    return bool(filename) and str(filename).lower().endswith('.csv')
+
 def handle_cors_preflight():
     """Handle CORS preflight requests"""
     return lambda_response(200, {'message': 'CORS preflight handled'})
 
 def safe_decimal_to_float(obj):
-    """Convert Decimal objects to float for JSON serialization"""
+    """Convert Decimal objects to float for JSON serialization (mutates dicts/lists in place)"""
     if isinstance(obj, Decimal):
         return float(obj)
-    elif isinstance(obj, dict):
-        return {k: safe_decimal_to_float(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [safe_decimal_to_float(v) for v in obj]
+    
+    stack = [obj]
+    while stack:
+        container = stack.pop()
+        if isinstance(container, dict):
+            items = container.items()
+        elif isinstance(container, list):
+            items = enumerate(container)
+        else:
+            continue
+        
+        for key, value in items:
+            if isinstance(value, Decimal):
+                container[key] = float(value)
+            elif isinstance(value, (dict, list)):
+                stack.append(value)
     return obj
 
+def cached(key: str, ttl: float, loader) -> Any:
+    """Return a value held in this container for up to ttl seconds, calling loader on a miss"""
+    now = time.monotonic()
+    entry = memory_cache.get(key)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    
+    value = loader()
+    memory_cache.pop(key, None)
+    if len(memory_cache) >= MEMORY_CACHE_MAX_ENTRIES:
+        memory_cache.pop(next(iter(memory_cache)))
+    memory_cache[key] = (now + ttl, value)
+    return value
+
+def batch_get_items(table_name: str, keys: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fetch items by key with BatchGetItem, 100 keys per request, retrying unprocessed keys"""
+    items = []
+    for start in range(0, len(keys), DYNAMODB_BATCH_GET_SIZE):
+        request_items = {table_name: {'Keys': keys[start:start + DYNAMODB_BATCH_GET_SIZE]}}
+        attempt = 0
+        while request_items:
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            items.extend(response.get('Responses', {}).get(table_name, []))
+            request_items = response.get('UnprocessedKeys') or {}
+            if request_items:
+                attempt += 1
+                if attempt > DYNAMODB_BATCH_GET_RETRIES:
+                    raise RuntimeError(f"Unprocessed keys remain for {table_name} after {attempt - 1} retries")
+                time.sleep(0.05 * (2 ** attempt))
+    return items
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # 🗂️ S3 FILE MANAGER - ROBUST FILE OPERATIONS
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -111,11 +261,11 @@ class S3FileManager:
                 }
             )
             
-            logger.info(f"Successfully uploaded file {original_filename} to s3://{self.upload_bucket}/{s3_key}")
+            logger.info("Successfully uploaded file %s to s3://%s/%s", original_filename, self.upload_bucket, s3_key)
             return s3_key, original_filename
             
         except Exception as e:
-            logger.error(f"Failed to upload file {original_filename}: {e}")
+            logger.error("Failed to upload file %s: %s", original_filename, e)
             raise
     
     def get_file_content(self, s3_key: str, bucket: str = None) -> bytes:
@@ -125,7 +275,7 @@ class S3FileManager:
             response = self.s3_client.get_object(Bucket=bucket, Key=s3_key)
             return response['Body'].read()
         except Exception as e:
-            logger.error(f"Failed to retrieve file {s3_key}: {e}")
+            logger.error("Failed to retrieve file %s: %s", s3_key, e)
             raise
     
     def create_presigned_url(self, s3_key: str, expiration: int = 3600, bucket: str = None) -> str:
@@ -139,25 +289,31 @@ class S3FileManager:
             )
             return url
         except Exception as e:
-            logger.error(f"Failed to create presigned URL for {s3_key}: {e}")
+            logger.error("Failed to create presigned URL for %s: %s", s3_key, e)
             raise
     
-    def save_processed_file(self, file_content: bytes, filename: str, session_id: str) -> str:
-        """Save processed file to S3"""
+    def save_processed_file(self, file_content: Union[bytes, BinaryIO], filename: str, session_id: str) -> str:
+        """Save processed file to S3, streaming file objects through the managed transfer"""
         try:
             s3_key = f"processed/{session_id}/{filename}"
-            self.s3_client.put_object(
-                Bucket=self.processed_bucket,
-                Key=s3_key,
-                Body=file_content,
-                Metadata={
-                    'session_id': session_id,
-                    'processed_time': datetime.utcnow().isoformat()
-                }
+            if isinstance(file_content, (bytes, bytearray)):
+                file_content = io.BytesIO(file_content)
+            
+            self.s3_client.upload_fileobj(
+                file_content,
+                self.processed_bucket,
+                s3_key,
+                ExtraArgs={
+                    'Metadata': {
+                        'session_id': session_id,
+                        'processed_time': datetime.utcnow().isoformat()
+                    }
+                },
+                Config=PROCESSED_UPLOAD_CONFIG
             )
             return s3_key
         except Exception as e:
-            logger.error(f"Failed to save processed file {filename}: {e}")
+            logger.error("Failed to save processed file %s: %s", filename, e)
             raise
     
     def cleanup_old_files(self, days: int = 7):
@@ -165,21 +321,89 @@ class S3FileManager:
         try:
             cutoff_date = datetime.utcnow() - timedelta(days=days)
             
-            # Clean upload bucket
+            # Collect expired keys from the upload bucket
             paginator = self.s3_client.get_paginator('list_objects_v2')
-            for page in paginator.paginate(Bucket=self.upload_bucket):
-                for obj in page.get('Contents', []):
-                    if obj['LastModified'].replace(tzinfo=None) < cutoff_date:
-                        self.s3_client.delete_object(Bucket=self.upload_bucket, Key=obj['Key'])
-                        logger.info(f"Cleaned up old file: {obj['Key']}")
+            expired_keys = [
+                obj['Key']
+                for page in paginator.paginate(Bucket=self.upload_bucket)
+                for obj in page.get('Contents', [])
+                if obj['LastModified'].replace(tzinfo=None) < cutoff_date
+            ]
+            
+            def delete_batch(keys: List[str]) -> int:
+                response = self.s3_client.delete_objects(
+                    Bucket=self.upload_bucket,
+                    Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+                )
+                errors = response.get('Errors', [])
+                for error in errors:
+                    logger.error("Failed to clean up %s: %s", error.get('Key'), error.get('Message'))
+                return len(keys) - len(errors)
+            
+            batches = [
+                expired_keys[i:i + S3_DELETE_BATCH_SIZE]
+                for i in range(0, len(expired_keys), S3_DELETE_BATCH_SIZE)
+            ]
+            
+            # Batches are independent HTTP calls, so dispatch them concurrently
+            with ThreadPoolExecutor(max_workers=S3_CLEANUP_WORKERS) as executor:
+                deleted = sum(executor.map(delete_batch, batches))
+            
+            logger.info("Cleaned up %s old files from %s", deleted, self.upload_bucket)
                         
         except Exception as e:
-            logger.error(f"Failed to cleanup old files: {e}")
+            logger.error("Failed to cleanup old files: %s", e)
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # 📊 ADVANCED BOM HEADER MAPPER - AI-POWERED MAPPING
 # ═══════════════════════════════════════════════════════════════════════════════
 
+# Comprehensive synonym mapping, shared by every mapper instance in a warm container
+HEADER_SYNONYMS = {
+    'item_code': ['part_number', 'part_no', 'item_id', 'sku', 'mpn', 'manufacturer_part_number'],
+    'item_name': ['description', 'name', 'title', 'component', 'part_description'],
+    'quantity': ['qty', 'amount', 'count', 'pieces', 'pcs'],
+    'unit': ['uom', 'unit_of_measure', 'units'],
+    'manufacturer': ['mfg', 'maker', 'brand', 'vendor', 'supplier'],
+    'specification': ['spec', 'properties', 'specs', 'characteristics'],
+    'value': ['val', 'data', 'rating', 'nominal'],
+    'reference': ['ref', 'designator', 'ref_des', 'location'],
+    'type': ['category', 'class', 'family', 'group'],
+    'price': ['cost', 'rate', 'price_per_unit', 'unit_cost'],
+    'voltage': ['v', 'volt', 'volts', 'vdc', 'vac'],
+    'current': ['i', 'amp', 'amps', 'ampere', 'ma', 'ua'],
+    'resistance': ['r', 'ohm', 'ohms', 'resistance'],
+    'capacitance': ['c', 'cap', 'farad', 'uf', 'pf', 'nf'],
+    'tolerance': ['tol', 'tolerance_percent', 'accuracy'],
+    'package': ['footprint', 'case', 'housing', 'form_factor'],
+    'temperature': ['temp', 'temp_range', 'operating_temp'],
+    'power': ['p', 'power_rating', 'watts', 'w', 'power_dissipation']
+}
+
+HEADER_ABBREVIATIONS = {
+    'qty': 'quantity',
+    'desc': 'description',
+    'mfg': 'manufacturer',
+    'uom': 'unit',
+    'ref': 'reference',
+    'spec': 'specification',
+    'val': 'value',
+    'temp': 'temperature',
+    'vol': 'voltage',
+    'cur': 'current',
+    'res': 'resistance',
+    'cap': 'capacitance',
+    'tol': 'tolerance'
+}
+
+# Inverted synonym index: synonym -> canonical, canonical -> group id
+SYNONYM_CANONICAL = {
+    synonym: canonical
+    for canonical, synonyms in HEADER_SYNONYMS.items()
+    for synonym in synonyms
+}
+CANONICAL_IDS = {canonical: i for i, canonical in enumerate(HEADER_SYNONYMS)}
+
 class AdvancedBOMHeaderMapper:
     """AI-powered header mapping with fuzzy matching and semantic understanding"""
     
@@ -193,99 +417,138 @@ class AdvancedBOMHeaderMapper:
             'levenshtein': 0.10
         }
         
-        # Comprehensive synonym mapping
-        self.synonyms = {
-            'item_code': ['part_number', 'part_no', 'item_id', 'sku', 'mpn', 'manufacturer_part_number'],
-            'item_name': ['description', 'name', 'title', 'component', 'part_description'],
-            'quantity': ['qty', 'amount', 'count', 'pieces', 'pcs'],
-            'unit': ['uom', 'unit_of_measure', 'units'],
-            'manufacturer': ['mfg', 'maker', 'brand', 'vendor', 'supplier'],
-            'specification': ['spec', 'properties', 'specs', 'characteristics'],
-            'value': ['val', 'data', 'rating', 'nominal'],
-            'reference': ['ref', 'designator', 'ref_des', 'location'],
-            'type': ['category', 'class', 'family', 'group'],
-            'price': ['cost', 'rate', 'price_per_unit', 'unit_cost'],
-            'voltage': ['v', 'volt', 'volts', 'vdc', 'vac'],
-            'current': ['i', 'amp', 'amps', 'ampere', 'ma', 'ua'],
-            'resistance': ['r', 'ohm', 'ohms', 'resistance'],
-            'capacitance': ['c', 'cap', 'farad', 'uf', 'pf', 'nf'],
-            'tolerance': ['tol', 'tolerance_percent', 'accuracy'],
-            'package': ['footprint', 'case', 'housing', 'form_factor'],
-            'temperature': ['temp', 'temp_range', 'operating_temp'],
-            'power': ['p', 'power_rating', 'watts', 'w', 'power_dissipation']
-        }
-        
-        self.abbreviations = {
-            'qty': 'quantity',
-            'desc': 'description',
-            'mfg': 'manufacturer',
-            'uom': 'unit',
-            'ref': 'reference',
-            'spec': 'specification',
-            'val': 'value',
-            'temp': 'temperature',
-            'vol': 'voltage',
-            'cur': 'current',
-            'res': 'resistance',
-            'cap': 'capacitance',
-            'tol': 'tolerance'
-        }
+        self.synonyms = HEADER_SYNONYMS
+        self.abbreviations = HEADER_ABBREVIATIONS
+        self._synonym_canonical = SYNONYM_CANONICAL
+        self._canonical_ids = CANONICAL_IDS
+
+    def _open_sheet_rows(self, file_content: bytes, sheet_name: str = None, header_row: int = 0):
+        """Open a workbook in streaming mode and return it, the sheet width and a row iterator starting at the header"""
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(io.BytesIO(file_content), read_only=True, data_only=True)
+        if sheet_name is None:
+            sheet_name = workbook.sheetnames[0]
+        
+        worksheet = workbook[sheet_name]
+        # Blank sheet rows count towards header_row, as they do for read_excel(header=...)
+        rows = worksheet.iter_rows(min_row=header_row + 1, values_only=True)
+        return workbook, sheet_name, self._sheet_width(worksheet), rows
+    
+    @staticmethod
+    def _sheet_width(worksheet) -> int:
+        """Widest row in the sheet, from its dimension record or a scan when the record is missing"""
+        if worksheet.max_column is not None:
+            # Empty sheets still record an A1 dimension; a single cell adds no width beyond the header
+            return 0 if worksheet.max_row == 1 and worksheet.max_column == 1 else worksheet.max_column
+        
+        width = 0
+        for row in worksheet.iter_rows(values_only=True):
+            last = len(row)
+            while last and row[last - 1] in (None, ''):
+                last -= 1
+            width = max(width, last)
+        return width
     
-    def read_excel_headers(self, file_content: bytes, sheet_name: str = None, header_row: int = 0) -> List[str]:
+    @staticmethod
+    def _label_header_cells(header_cells, width: int = 0) -> List[str]:
+        """Label header cells the way pandas names DataFrame columns, padding to the sheet width"""
+        header_cells = list(header_cells)
+        while header_cells and header_cells[-1] in (None, ''):
+            header_cells.pop()
+        # Data rows wider than the header still become columns, named like blank header cells
+        header_cells.extend([None] * (width - len(header_cells)))
+        
+        labels = [
+            f"Unnamed: {i}" if value in (None, '') else str(value)
+            for i, value in enumerate(header_cells)
+        ]
+        unnamed = [i for i, value in enumerate(header_cells) if value in (None, '')]
+        
+        # Same mangling as pandas' parser: named columns claim labels before unnamed ones,
+        # and a renamed duplicate skips any label already present in the header
+        taken = set(labels)
+        counts = {}
+        unnamed_set = set(unnamed)
+        for i in [i for i in range(len(labels)) if i not in unnamed_set] + unnamed:
+            label = original = labels[i]
+            count = counts.get(label, 0)
+            while count > 0:
+                counts[original] = count + 1
+                label = f"{original}.{count}"
+                count = count + 1 if label in taken else counts.get(label, 0)
+            labels[i] = label
+            counts[label] = count + 1
+        return labels
+    
+    def read_excel_headers(self, file_content: bytes, sheet_name: str = None, header_row: int = 0,
+                           filename: str = None) -> List[str]:
         """Extract headers from Excel or CSV file content"""
+        import pandas as pd
+        
         try:
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-                tmp_file.write(file_content)
-                tmp_file_path = tmp_file.name
-            
-            try:
-                # Read Excel file
-                if sheet_name is None:
-                    xl_file = pd.ExcelFile(tmp_file_path)
-                    sheet_name = xl_file.sheet_names[0]
-                
-                df = pd.read_excel(tmp_file_path, sheet_name=sheet_name, header=header_row, nrows=1)
+            if is_csv_filename(filename):
+                df = pd.read_csv(io.BytesIO(file_content), header=header_row, nrows=0, engine='c')
                 headers = [str(col).strip() for col in df.columns if str(col).strip()]
                 
-                logger.info(f"Extracted {len(headers)} headers from {sheet_name}")
+                logger.info("Extracted %s headers from %s", len(headers), filename)
                 return headers
-                
+            
+            # Stream only the header row instead of building a DataFrame
+            workbook, sheet_name, width, rows = self._open_sheet_rows(file_content, sheet_name, header_row)
+            try:
+                labels = self._label_header_cells(next(rows, ()), width)
             finally:
-                # Clean up temp file
-                os.unlink(tmp_file_path)
+                workbook.close()
+            
+            headers = [label.strip() for label in labels if label.strip()]
+            
+            logger.info("Extracted %s headers from %s", len(headers), sheet_name)
+            return headers
                 
         except Exception as e:
-            logger.error(f"Error reading Excel headers: {e}")
+            logger.error("Error reading Excel headers: %s", e)
             return []
     
-    def read_sample_data(self, file_content: bytes, sheet_name: str = None, header_row: int = 0, sample_rows: int = 5) -> Dict[str, List[str]]:
+    def read_sample_data(self, file_content: bytes, sheet_name: str = None, header_row: int = 0, sample_rows: int = 5,
+                         filename: str = None) -> Dict[str, List[str]]:
         """Read sample data for pattern analysis"""
+        import pandas as pd
+        
         try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-                tmp_file.write(file_content)
-                tmp_file_path = tmp_file.name
-            
-            try:
-                if sheet_name is None:
-                    xl_file = pd.ExcelFile(tmp_file_path)
-                    sheet_name = xl_file.sheet_names[0]
-                
-                df = pd.read_excel(tmp_file_path, sheet_name=sheet_name, header=header_row, nrows=sample_rows)
+            if is_csv_filename(filename):
+                df = pd.read_csv(
+                    io.BytesIO(file_content), header=header_row, nrows=sample_rows, dtype=str, engine='c'
+                )
                 
                 sample_data = {}
                 for col in df.columns:
                     col_str = str(col).strip()
                     if col_str:
-                        sample_data[col_str] = [str(val) for val in df[col].dropna().tolist()]
+                        sample_data[col_str] = df[col].dropna().tolist()
                 
                 return sample_data
-                
+            
+            workbook, sheet_name, width, rows = self._open_sheet_rows(file_content, sheet_name, header_row)
+            try:
+                labels = self._label_header_cells(next(rows, ()), width)
+                sample_rows_data = list(itertools.islice(rows, sample_rows))
             finally:
-                os.unlink(tmp_file_path)
+                workbook.close()
+            
+            sample_data = {}
+            for i, label in enumerate(labels):
+                col_str = label.strip()
+                if col_str:
+                    sample_data[col_str] = [
+                        str(row[i]) for row in sample_rows_data
+                        if i < len(row) and row[i] is not None
+                    ]
+            
+            return sample_data
                 
         except Exception as e:
-            logger.error(f"Error reading sample data: {e}")
+            logger.error("Error reading sample data: %s", e)
             return {}
     
     def calculate_semantic_similarity(self, header1: str, header2: str) -> float:
@@ -315,58 +578,115 @@ class AdvancedBOMHeaderMapper:
         
         if expanded1 == expanded2:
             return 0.85
-        
+
         return 0.0
-    
+
+    def calculate_semantic_similarity_matrix(self, headers1: List[str], headers2: List[str]) -> np.ndarray:
+        """Semantic similarity for every header pair, equivalent to calculate_semantic_similarity"""
+        import numpy as np
+        
+        norm1 = np.array([str(h).lower().strip() for h in headers1], dtype=object)
+        norm2 = np.array([str(h).lower().strip() for h in headers2], dtype=object)
+
+        # Distinct "missing" sentinels per side so unmatched headers never compare equal
+        group1 = np.array([self._canonical_ids.get(self._synonym_canonical.get(h), -1) for h in norm1], dtype=np.int64)
+        group2 = np.array([self._canonical_ids.get(self._synonym_canonical.get(h), -2) for h in norm2], dtype=np.int64)
+        canonical1 = np.array([self._canonical_ids.get(h, -3) for h in norm1], dtype=np.int64)
+        canonical2 = np.array([self._canonical_ids.get(h, -4) for h in norm2], dtype=np.int64)
+        expanded1 = np.array([self.abbreviations.get(h, h) for h in norm1], dtype=object)
+        expanded2 = np.array([self.abbreviations.get(h, h) for h in norm2], dtype=object)
+
+        valid = (norm1 != '')[:, None] & (norm2 != '')[None, :]
+        exact = norm1[:, None] == norm2[None, :]
+        same_group = group1[:, None] == group2[None, :]
+        canonical_match = (canonical1[:, None] == group2[None, :]) | (group1[:, None] == canonical2[None, :])
+        abbreviation_match = expanded1[:, None] == expanded2[None, :]
+
+        scores = np.select(
+            [exact, same_group, canonical_match, abbreviation_match],
+            [1.0, 0.95, 0.9, 0.85],
+            default=0.0
+        )
+        return np.where(valid, scores, 0.0).reshape(len(headers1), len(headers2))
+
     def map_headers_to_template(self, client_content: bytes, template_content: bytes, 
                                client_sheet: str = None, template_sheet: str = None,
-                               client_header_row: int = 0, template_header_row: int = 0) -> List[Dict]:
+                               client_header_row: int = 0, template_header_row: int = 0,
+                               client_filename: str = None, template_filename: str = None,
+                               template_s3_key: str = None, client_s3_key: str = None) -> List[Dict]:
         """Advanced header mapping with AI suggestions"""
+        import numpy as np
+        
         try:
-            template_headers = self.read_excel_headers(template_content, template_sheet, template_header_row)
-            client_headers = self.read_excel_headers(client_content, client_sheet, client_header_row)
+            if template_s3_key:
+                template_headers = list(get_template_headers_cached(
+                    template_s3_key, template_sheet, template_header_row, template_filename
+                ))
+            else:
+                template_headers = self.read_excel_headers(
+                    template_content, template_sheet, template_header_row, filename=template_filename
+                )
+            if client_s3_key:
+                client_headers = list(get_client_headers_cached(
+                    client_s3_key, client_sheet, client_header_row, client_filename
+                ))
+            else:
+                client_headers = self.read_excel_headers(
+                    client_content, client_sheet, client_header_row, filename=client_filename
+                )
             
-            client_sample_data = self.read_sample_data(client_content, client_sheet, client_header_row)
+            client_sample_data = self.read_sample_data(
+                client_content, client_sheet, client_header_row, filename=client_filename
+            )
             
             results = []
-            used_client_headers = set()
-            
-            for template_header in template_headers:
+
+            # Score every (template, client) pair in one shot with RapidFuzz's C++ backend
+            template_lower = [h.lower() for h in template_headers]
+            client_lower = [h.lower() for h in client_headers]
+            shape = (len(template_headers), len(client_headers))
+
+            if client_headers and template_headers:
+                jaro_scores = cdist(template_lower, client_lower, scorer=fuzz.ratio, dtype=np.float64, workers=-1) / 100.0
+                token_scores = cdist(template_lower, client_lower, scorer=fuzz.token_sort_ratio, dtype=np.float64, workers=-1) / 100.0
+                partial_scores = cdist(template_lower, client_lower, scorer=fuzz.partial_ratio, dtype=np.float64, workers=-1) / 100.0
+            else:
+                jaro_scores = token_scores = partial_scores = np.zeros(shape)
+
+            semantic_scores = self.calculate_semantic_similarity_matrix(template_headers, client_headers)
+
+            # Weighted average
+            final_scores = (
+                semantic_scores * self.similarity_weights['semantic'] +
+                jaro_scores * self.similarity_weights['jaro_winkler'] +
+                token_scores * self.similarity_weights['token_sort'] +
+                partial_scores * self.similarity_weights['partial_ratio']
+            )
+
+            # Client headers not yet claimed by an earlier template header
+            available = np.ones(len(client_headers), dtype=bool)
+
+            for i, template_header in enumerate(template_headers):
                 best_match = None
                 best_score = 0.0
                 best_explanation = ""
-                
-                for client_header in client_headers:
-                    if client_header in used_client_headers:
-                        continue
-                    
-                    # Calculate comprehensive similarity score
-                    semantic_score = self.calculate_semantic_similarity(template_header, client_header)
-                    jaro_score = fuzz.ratio(template_header.lower(), client_header.lower()) / 100.0
-                    token_score = fuzz.token_sort_ratio(template_header.lower(), client_header.lower()) / 100.0
-                    partial_score = fuzz.partial_ratio(template_header.lower(), client_header.lower()) / 100.0
-                    
-                    # Weighted average
-                    final_score = (
-                        semantic_score * self.similarity_weights['semantic'] +
-                        jaro_score * self.similarity_weights['jaro_winkler'] +
-                        token_score * self.similarity_weights['token_sort'] +
-                        partial_score * self.similarity_weights['partial_ratio']
-                    )
-                    
-                    if final_score > best_score:
-                        best_score = final_score
-                        best_match = client_header
-                        
-                        if semantic_score > 0:
-                            best_explanation = f"Semantic match (score: {semantic_score:.2f})"
+
+                if client_headers:
+                    scores = final_scores[i] * available
+                    j = int(scores.argmax())
+                    if scores[j] > 0:
+                        best_score = float(scores[j])
+                        best_match = client_headers[j]
+
+                        if semantic_scores[i, j] > 0:
+                            best_explanation = f"Semantic match (score: {semantic_scores[i, j]:.2f})"
                         else:
-                            best_explanation = f"Fuzzy match (score: {final_score:.2f})"
-                
+                            best_explanation = f"Fuzzy match (score: {best_score:.2f})"
+
                 confidence = int(best_score * 100)
-                
+
                 if best_match and confidence >= self.min_confidence_threshold:
-                    used_client_headers.add(best_match)
+                    available[j] = False
                     mapped_header = best_match
                 else:
                     mapped_header = None
@@ -381,13 +701,27 @@ class AdvancedBOMHeaderMapper:
                     'sample_data': sample_data[:3]
                 })
             
-            logger.info(f"Mapped {len([r for r in results if r['mapped_client_header']])} out of {len(template_headers)} headers")
+            logger.info("Mapped %s out of %s headers", len([r for r in results if r['mapped_client_header']]), len(template_headers))
             return results
             
         except Exception as e:
-            logger.error(f"Error in header mapping: {e}")
+            logger.error("Error in header mapping: %s", e)
             return []
 
+@lru_cache(maxsize=128)
+def get_client_headers_cached(s3_key: str, sheet_name: str = None, header_row: int = 0,
+                              filename: str = None) -> Tuple[str, ...]:
+    """Client headers for an uploaded file; upload keys are unique so the key identifies the content"""
+    client_content = S3FileManager().get_file_content(s3_key)
+    return tuple(AdvancedBOMHeaderMapper().read_excel_headers(client_content, sheet_name, header_row, filename=filename))
+
+@lru_cache(maxsize=32)
+def get_template_headers_cached(s3_key: str, sheet_name: str = None, header_row: int = 0,
+                                filename: str = None) -> Tuple[str, ...]:
+    """Template headers for an uploaded template; like client uploads, the key identifies the content"""
+    template_content = S3FileManager().get_file_content(s3_key)
+    return tuple(AdvancedBOMHeaderMapper().read_excel_headers(template_content, sheet_name, header_row, filename=filename))
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # 🔄 DATA TRANSFORMATION ENGINE
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -398,123 +732,276 @@ class DataTransformationEngine:
     def __init__(self):
         self.file_manager = S3FileManager()
     
-    def apply_column_mappings(self, client_content: bytes, mappings: Dict, 
-                             sheet_name: str = None, header_row: int = 0) -> Dict[str, Any]:
-        """Apply column mappings with support for duplicate mappings"""
+    def _read_client_frame(self, client_content: bytes, sheet_name: str = None, header_row: int = 0,
+                           filename: str = None, columns: Set[str] = None) -> pd.DataFrame:
+        """Read client data as strings, optionally projecting to the given column names"""
+        import pandas as pd
+        
+        usecols = (lambda col: str(col).strip() in columns) if columns else None
+        
+        # Read client data straight from memory; the original filename decides the parser
+        if is_csv_filename(filename):
+            return pd.read_csv(io.BytesIO(client_content), header=header_row, dtype=str, usecols=usecols)
+        
+        result = pd.read_excel(
+            io.BytesIO(client_content),
+            sheet_name=sheet_name,
+            header=header_row,
+            engine=EXCEL_READ_ENGINE,
+            usecols=usecols,
+            dtype=str
+        )
+        
+        if isinstance(result, dict):
+            first_sheet_name = list(result.keys())[0]
+            return result[first_sheet_name]
+        return result
+    
+    def _load_client_frame(self, client_content: Optional[bytes], sheet_name: str = None, header_row: int = 0,
+                           filename: str = None, columns: Set[str] = None,
+                           client_s3_key: str = None) -> pd.DataFrame:
+        """Read client data, reusing a /tmp snapshot keyed by the S3 key when one is given"""
+        import pandas as pd
+        
+        if not client_s3_key:
+            return self._read_client_frame(client_content, sheet_name, header_row, filename, columns)
+        
+        # Upload keys carry a fresh UUID and are never rewritten, so the key identifies the content
+        cache_key = repr((client_s3_key, sheet_name, str(header_row), is_csv_filename(filename), sorted(columns or ())))
+        cache_path = os.path.join(CLIENT_FRAME_CACHE_DIR, hashlib.sha1(cache_key.encode('utf-8')).hexdigest() + '.pkl')
+        
+        if os.path.exists(cache_path):
+            try:
+                return pd.read_pickle(cache_path)
+            except Exception as e:
+                logger.warning("Discarding unreadable frame cache %s: %s", cache_path, e)
+        
+        if client_content is None:
+            client_content = self.file_manager.get_file_content(client_s3_key)
+        df = self._read_client_frame(client_content, sheet_name, header_row, filename, columns)
+        
         try:
-            logger.info(f"Applying mappings: {mappings}")
+            os.makedirs(CLIENT_FRAME_CACHE_DIR, exist_ok=True)
+            snapshots = sorted(
+                (os.path.join(CLIENT_FRAME_CACHE_DIR, name) for name in os.listdir(CLIENT_FRAME_CACHE_DIR)),
+                key=os.path.getmtime
+            )
+            for stale_path in snapshots[:max(0, len(snapshots) - CLIENT_FRAME_CACHE_MAX_FILES + 1)]:
+                os.remove(stale_path)
             
-            # Read client data
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-                tmp_file.write(client_content)
-                tmp_file_path = tmp_file.name
+            # Write then rename so a concurrent reader never sees a partial file
+            temp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+            df.to_pickle(temp_path)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            logger.warning("Could not write frame cache %s: %s", cache_path, e)
+        
+        return df
+    
+    def apply_column_mappings(self, client_content: Optional[bytes], mappings: Dict, 
+                             sheet_name: str = None, header_row: int = 0,
+                             filename: str = None, start_row: int = 0, n_rows: int = None,
+                             client_s3_key: str = None) -> Dict[str, Any]:
+        """Apply column mappings with support for duplicate mappings, optionally to a row window only"""
+        import pandas as pd
+        
+        try:
+            logger.info("Applying mappings: %s", mappings)
             
-            try:
-                if str(tmp_file_path).lower().endswith('.csv'):
-                    df = pd.read_csv(tmp_file_path, header=header_row)
-                else:
-                    result = pd.read_excel(tmp_file_path, sheet_name=sheet_name, header=header_row)
-                    
-                    if isinstance(result, dict):
-                        first_sheet_name = list(result.keys())[0]
-                        df = result[first_sheet_name]
+            # Process mappings
+            mapping_list = []
+            if isinstance(mappings, dict) and 'mappings' in mappings:
+                mapping_list = mappings['mappings']
+            elif isinstance(mappings, list):
+                mapping_list = mappings
+            else:
+                for target, source in mappings.items():
+                    if isinstance(source, list):
+                        for src in source:
+                            mapping_list.append({'source': src, 'target': target})
                     else:
-                        df = result
-                
-                # Clean column names
-                df.columns = [str(col).strip() for col in df.columns]
-                
-                # Process mappings
-                mapping_list = []
-                if isinstance(mappings, dict) and 'mappings' in mappings:
-                    mapping_list = mappings['mappings']
-                elif isinstance(mappings, list):
-                    mapping_list = mappings
-                else:
-                    for target, source in mappings.items():
-                        if isinstance(source, list):
-                            for src in source:
-                                mapping_list.append({'source': src, 'target': target})
-                        else:
-                            mapping_list.append({'source': source, 'target': target})
-                
-                # Build column order
-                mapped_targets = []
-                mapping_dict = {}
-                
-                for mapping in mapping_list:
-                    target = mapping['target']
-                    if target not in mapping_dict:
-                        mapping_dict[target] = []
-                        mapped_targets.append(target)
-                    mapping_dict[target].append(mapping)
-                
-                column_order = mapped_targets.copy()
-                
-                # Process each row
-                transformed_rows = []
-                for _, row in df.iterrows():
-                    transformed_row = []
-                    
-                    for target_column in column_order:
-                        if target_column in mapping_dict:
-                            mappings_for_target = mapping_dict[target_column]
-                            for mapping in mappings_for_target:
-                                source_column = mapping['source']
-                                
-                                if source_column and source_column in df.columns:
-                                    value = row.get(source_column, "")
-                                    if pd.isna(value):
-                                        value = ""
-                                    else:
-                                        value = str(value).strip()
-                                    transformed_row.append(value)
-                                else:
-                                    transformed_row.append("")
+                        mapping_list.append({'source': source, 'target': target})
+            
+            # Only parse the client columns the mappings actually reference
+            needed_columns = {str(m['source']).strip() for m in mapping_list if m.get('source')}
+            df = self._load_client_frame(
+                client_content, sheet_name, header_row, filename, needed_columns, client_s3_key
+            )
+            if needed_columns and len(df.columns) == 0:
+                # No referenced column exists; re-read everything so the row count is preserved
+                df = self._load_client_frame(client_content, sheet_name, header_row, filename, None, client_s3_key)
+            
+            # Clean column names
+            df.columns = [str(col).strip() for col in df.columns]
+            
+            # Transform only the requested window; the full count is still reported
+            total_rows = len(df)
+            if n_rows is not None:
+                df = df.iloc[start_row:start_row + n_rows]
+            
+            # Build column order
+            mapped_targets = []
+            mapping_dict = {}
+            
+            for mapping in mapping_list:
+                target = mapping['target']
+                if target not in mapping_dict:
+                    mapping_dict[target] = []
+                    mapped_targets.append(target)
+                mapping_dict[target].append(mapping)
+            
+            column_order = mapped_targets.copy()
+            
+            # Build each output column in one vectorized pass
+            output_columns = []
+            for target_column in column_order:
+                for mapping in mapping_dict[target_column]:
+                    source_column = mapping['source']
+
+                    if source_column and source_column in df.columns:
+                        series = df[source_column]
+                        output_columns.append(series.map(str).str.strip().where(series.notna(), ""))
+                    else:
+                        output_columns.append(pd.Series("", index=df.index, dtype=object))
+
+            if output_columns:
+                transformed_df = pd.concat(output_columns, axis=1, ignore_index=True)
+            else:
+                transformed_df = pd.DataFrame(index=df.index)
+            
+            # Build headers with unique names
+            final_headers = []
+            counts = {}
+            
+            for target_column in column_order:
+                if target_column in mapping_dict:
+                    for _ in mapping_dict[target_column]:
+                        if target_column not in counts:
+                            counts[target_column] = 1
+                            final_headers.append(target_column)
                         else:
-                            transformed_row.append("")
-                    
-                    transformed_rows.append(transformed_row)
-                
-                # Build headers with unique names
-                final_headers = []
-                counts = {}
-                
-                for target_column in column_order:
-                    if target_column in mapping_dict:
-                        for _ in mapping_dict[target_column]:
-                            if target_column not in counts:
-                                counts[target_column] = 1
-                                final_headers.append(target_column)
-                            else:
+                            counts[target_column] += 1
+                            new_header = f"{target_column}_{counts[target_column]}"
+                            while new_header in final_headers:
                                 counts[target_column] += 1
                                 new_header = f"{target_column}_{counts[target_column]}"
-                                while new_header in final_headers:
-                                    counts[target_column] += 1
-                                    new_header = f"{target_column}_{counts[target_column]}"
-                                final_headers.append(new_header)
-                    else:
-                        final_headers.append(target_column)
-                
-                return {
-                    'headers': final_headers,
-                    'data': transformed_rows
-                }
-                
-            finally:
-                os.unlink(tmp_file_path)
+                            final_headers.append(new_header)
+                else:
+                    final_headers.append(target_column)
+            
+            transformed_df.columns = final_headers
+            transformed_df.reset_index(drop=True, inplace=True)
+            
+            return {
+                'headers': final_headers,
+                'df': transformed_df,
+                'total_rows': total_rows
+            }
                 
         except Exception as e:
-            logger.error(f"Error in apply_column_mappings: {e}")
-            return {'headers': [], 'data': []}
+            logger.error("Error in apply_column_mappings: %s", e)
+            return {'headers': [], 'df': pd.DataFrame(), 'total_rows': 0}
     
-    def apply_formula_rules(self, data_rows: List[Dict], headers: List[str], 
+    def _first_matching_sub_rule(self, cell_values: pd.Series, prepared_rules: List[Tuple]) -> pd.Series:
+        """Index of the first sub-rule whose search text occurs in each cell (-1 when none match)"""
+        import numpy as np
+        import pandas as pd
+        
+        # Lower-case the column once, and only when a case-insensitive sub-rule needs it
+        raw_values = cell_values.to_numpy()
+        if all(case_sensitive for _, _, _, case_sensitive in prepared_rules):
+            lower_values = raw_values
+        else:
+            lower_values = cell_values.str.lower().to_numpy()
+        
+        if ahocorasick is not None and len(prepared_rules) >= AHOCORASICK_MIN_PATTERNS:
+            # One automaton per case mode; each keyword keeps its lowest sub-rule index
+            automata = []
+            for case_sensitive in (False, True):
+                keywords = {}
+                for index, search_compare, _, rule_case_sensitive in prepared_rules:
+                    if rule_case_sensitive == case_sensitive:
+                        keywords.setdefault(search_compare, index)
+                if keywords:
+                    automaton = ahocorasick.Automaton()
+                    for keyword, index in keywords.items():
+                        automaton.add_word(keyword, index)
+                    automaton.make_automaton()
+                    automata.append((case_sensitive, automaton))
+            
+            first_match = [
+                min(
+                    (index for case_sensitive, automaton in automata
+                     for _, index in automaton.iter(cell_raw if case_sensitive else cell_lower)),
+                    default=-1
+                )
+                for cell_raw, cell_lower in zip(raw_values, lower_values)
+            ]
+            return pd.Series(first_match, index=cell_values.index, dtype=np.int64)
+        
+        # Each sub-rule only scans the rows no earlier sub-rule has claimed
+        first_match = np.full(len(cell_values), -1, dtype=np.int64)
+        for index, search_compare, _, case_sensitive in prepared_rules:
+            pending = np.flatnonzero(first_match < 0)
+            if pending.size == 0:
+                break
+            
+            haystack = raw_values if case_sensitive else lower_values
+            candidates = pd.Series(haystack[pending], dtype=object)
+            matches = candidates.str.contains(search_compare, regex=False).to_numpy(dtype=bool)
+            first_match[pending[matches]] = index
+        return pd.Series(first_match, index=cell_values.index)
+    
+    def _apply_sub_rules(self, df: pd.DataFrame, source_column: str, target_column: str,
+                         sub_rules: List[Dict]):
+        """Write the first matching sub-rule output for every row into target_column"""
+        import numpy as np
+        import pandas as pd
+        
+        if source_column in df.columns:
+            cell_values = df[source_column].map(str)
+        else:
+            cell_values = pd.Series('', index=df.index, dtype=object)
+        
+        # Search text is lower-cased once per sub-rule, not once per row
+        prepared_rules = []
+        for index, sub_rule in enumerate(sub_rules):
+            search_text = sub_rule.get('search_text', '')
+            output_value = sub_rule.get('output_value', '')
+            case_sensitive = sub_rule.get('case_sensitive', False)
+            
+            if search_text and output_value:
+                search_compare = search_text if case_sensitive else search_text.lower()
+                prepared_rules.append((index, search_compare, output_value, case_sensitive))
+        
+        if not prepared_rules:
+            return
+        
+        first_match = self._first_matching_sub_rule(cell_values, prepared_rules)
+        
+        for index, _, output_value, _ in prepared_rules:
+            hits = first_match == index
+            if not hits.any():
+                continue
+            
+            current = df.loc[hits, target_column]
+            existing = current.astype(str).str.strip()
+            already_listed = existing.str.split(',').map(
+                lambda parts: output_value in [part.strip() for part in parts]
+            )
+            df.loc[hits, target_column] = np.where(
+                (existing == '') | (existing == output_value),
+                output_value,
+                np.where(already_listed, current, existing + ', ' + output_value)
+            )
+    
+    def apply_formula_rules(self, df: pd.DataFrame, headers: List[str], 
                            formula_rules: List[Dict]) -> Dict[str, Any]:
         """Apply formula rules with sub-rules support"""
-        if not data_rows or not formula_rules:
-            return {'data': data_rows, 'headers': headers, 'new_columns': []}
+        if df.empty or not formula_rules:
+            return {'df': df, 'headers': headers, 'new_columns': []}
         
-        modified_data = [row.copy() for row in data_rows]
+        df = df.copy()
         new_headers = headers.copy()
         new_columns = []
         
@@ -542,32 +1029,10 @@ class DataTransformationEngine:
                 used_column_names.add(column_name)
                 tag_counter += 1
                 
-                for row in modified_data:
-                    if column_name not in row:
-                        row[column_name] = ''
-                    
-                    for sub_rule in sub_rules:
-                        search_text = sub_rule.get('search_text', '')
-                        output_value = sub_rule.get('output_value', '')
-                        case_sensitive = sub_rule.get('case_sensitive', False)
-                        
-                        if not search_text or not output_value:
-                            continue
-                        
-                        cell_value = str(row.get(source_column, ''))
-                        search_text_compare = search_text if case_sensitive else search_text.lower()
-                        cell_value_compare = cell_value if case_sensitive else cell_value.lower()
-                        
-                        if search_text_compare in cell_value_compare:
-                            existing_value = row.get(column_name, '').strip()
-                            
-                            if existing_value and existing_value != output_value:
-                                existing_values = [v.strip() for v in existing_value.split(',')]
-                                if output_value not in existing_values:
-                                    row[column_name] = f"{existing_value}, {output_value}"
-                            else:
-                                row[column_name] = output_value
-                            break
+                if column_name not in df.columns:
+                    df[column_name] = ''
+                
+                self._apply_sub_rules(df, source_column, column_name, sub_rules)
             
             elif column_type == 'Specification Value' and specification_name:
                 name_column = f"Specification_Name_{spec_counter}"
@@ -582,71 +1047,58 @@ class DataTransformationEngine:
                 new_columns.extend([name_column, value_column])
                 used_column_names.update([name_column, value_column])
                 
-                for row in modified_data:
-                    if name_column not in row:
-                        row[name_column] = specification_name
-                    if value_column not in row:
-                        row[value_column] = ''
-                    
-                    for sub_rule in sub_rules:
-                        search_text = sub_rule.get('search_text', '')
-                        output_value = sub_rule.get('output_value', '')
-                        case_sensitive = sub_rule.get('case_sensitive', False)
-                        
-                        if not search_text or not output_value:
-                            continue
-                        
-                        cell_value = str(row.get(source_column, ''))
-                        search_text_compare = search_text if case_sensitive else search_text.lower()
-                        cell_value_compare = cell_value if case_sensitive else cell_value.lower()
-                        
-                        if search_text_compare in cell_value_compare:
-                            existing_value = row.get(value_column, '').strip()
-                            
-                            if existing_value and existing_value != output_value:
-                                existing_values = [v.strip() for v in existing_value.split(',')]
-                                if output_value not in existing_values:
-                                    row[value_column] = f"{existing_value}, {output_value}"
-                            else:
-                                row[value_column] = output_value
-                            break
+                if name_column not in df.columns:
+                    df[name_column] = specification_name
+                if value_column not in df.columns:
+                    df[value_column] = ''
+                
+                self._apply_sub_rules(df, source_column, value_column, sub_rules)
                 
                 spec_counter += 1
         
         return {
-            'data': modified_data,
+            'df': df,
             'headers': new_headers,
             'new_columns': new_columns,
-            'total_rows': len(modified_data)
+            'total_rows': len(df)
         }
     
-    def create_factwise_id(self, data_rows: List[Dict], headers: List[str], 
+    def create_factwise_id(self, df: pd.DataFrame, headers: List[str], 
                           first_column: str, second_column: str, operator: str = '_') -> Dict[str, Any]:
         """Create Factwise ID column"""
-        if not data_rows or first_column not in headers or second_column not in headers:
-            return {'data': data_rows, 'headers': headers}
+        import numpy as np
+        import pandas as pd
+        
+        if df.empty or first_column not in headers or second_column not in headers:
+            return {'df': df, 'headers': headers}
         
         new_headers = ["Factwise_ID"] + headers
-        new_data_rows = []
-        
-        for row in data_rows:
-            first_val = str(row.get(first_column, '')).strip()
-            second_val = str(row.get(second_column, '')).strip()
-            
-            if first_val and second_val:
-                factwise_id = f"{first_val}{operator}{second_val}"
-            elif first_val:
-                factwise_id = first_val
-            elif second_val:
-                factwise_id = second_val
-            else:
-                factwise_id = ""
-            
-            new_row = {"Factwise_ID": factwise_id, **row}
-            new_data_rows.append(new_row)
+        df = df.copy()
+        
+        def column_values(column):
+            if column not in df.columns:
+                return pd.Series('', index=df.index, dtype=object)
+            return df[column].map(str).str.strip()
+        
+        first_vals = column_values(first_column)
+        second_vals = column_values(second_column)
+        has_first = first_vals != ''
+        has_second = second_vals != ''
+        
+        factwise_ids = np.where(
+            has_first & has_second,
+            first_vals + operator + second_vals,
+            np.where(has_first, first_vals, second_vals)
+        )
+        
+        # An existing Factwise_ID column keeps its values and moves to the front
+        if "Factwise_ID" in df.columns:
+            df.insert(0, "Factwise_ID", df.pop("Factwise_ID"))
+        else:
+            df.insert(0, "Factwise_ID", factwise_ids)
         
         return {
-            'data': new_data_rows,
+            'df': df,
             'headers': new_headers
         }
 
@@ -661,25 +1113,45 @@ class SessionManager:
         self.sessions_table = sessions_table
         self.ttl_hours = 24
     
+    def _build_session_item(self, session_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a new session item with id, creation time and TTL"""
+        ttl = int((datetime.utcnow() + timedelta(hours=self.ttl_hours)).timestamp())
+        
+        return {
+            'session_id': str(uuid.uuid4()),
+            'created_at': datetime.utcnow().isoformat(),
+            'ttl': ttl,
+            **session_data
+        }
+    
     def create_session(self, session_data: Dict[str, Any]) -> str:
         """Create new session in DynamoDB"""
         try:
-            session_id = str(uuid.uuid4())
-            ttl = int((datetime.utcnow() + timedelta(hours=self.ttl_hours)).timestamp())
-            
-            item = {
-                'session_id': session_id,
-                'created_at': datetime.utcnow().isoformat(),
-                'ttl': ttl,
-                **session_data
-            }
+            item = self._build_session_item(session_data)
+            session_id = item['session_id']
             
             self.sessions_table.put_item(Item=item)
-            logger.info(f"Created session {session_id}")
+            logger.info("Created session %s", session_id)
             return session_id
             
         except Exception as e:
-            logger.error(f"Failed to create session: {e}")
+            logger.error("Failed to create session: %s", e)
+            raise
+    
+    def create_sessions_bulk(self, sessions: List[Dict[str, Any]]) -> List[str]:
+        """Create many sessions, letting batch_writer coalesce up to 25 puts per request"""
+        try:
+            items = [self._build_session_item(session_data) for session_data in sessions]
+            
+            with self.sessions_table.batch_writer() as batch:
+                for item in items:
+                    batch.put_item(Item=item)
+            
+            logger.info("Created %s sessions", len(items))
+            return [item['session_id'] for item in items]
+            
+        except Exception as e:
+            logger.error("Failed to create sessions in bulk: %s", e)
             raise
     
     def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
@@ -692,40 +1164,63 @@ class SessionManager:
             return None
             
         except Exception as e:
-            logger.error(f"Failed to get session {session_id}: {e}")
+            logger.error("Failed to get session %s: %s", session_id, e)
             return None
     
-    def update_session(self, session_id: str, updates: Dict[str, Any]):
-        """Update session data in DynamoDB"""
+    def batch_get(self, session_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get several sessions in as few round trips as possible, keyed by session id"""
         try:
-            update_expression = "SET "
-            expression_values = {}
+            unique_ids = list(dict.fromkeys(session_ids))
+            items = batch_get_items(self.sessions_table.name, [{'session_id': sid} for sid in unique_ids])
+            return {item['session_id']: item for item in items}
             
-            for key, value in updates.items():
-                update_expression += f"{key} = :{key}, "
-                expression_values[f":{key}"] = value
+        except Exception as e:
+            logger.error("Failed to batch get sessions: %s", e)
+            return {}
+    
+    def append_to_session_list(self, session_id: str, attribute: str, items: List[Any]):
+        """Append items to a list attribute server-side, creating the list when missing"""
+        try:
+            self.sessions_table.update_item(
+                Key={'session_id': session_id},
+                UpdateExpression="SET #attr = list_append(if_not_exists(#attr, :empty), :items)",
+                ExpressionAttributeNames={'#attr': attribute},
+                ExpressionAttributeValues={':empty': [], ':items': items}
+            )
+            logger.info("Appended %s item(s) to %s for session %s", len(items), attribute, session_id)
             
-            update_expression = update_expression.rstrip(", ")
+        except Exception as e:
+            logger.error("Failed to append to %s for session %s: %s", attribute, session_id, e)
+            raise
+    
+    def update_session(self, session_id: str, updates: Dict[str, Any]):
+        """Update session data in DynamoDB"""
+        try:
+            # Placeholders keep reserved words such as 'status' and 'name' usable as attribute names
+            expression_names = {f"#k{i}": key for i, key in enumerate(updates)}
+            expression_values = {f":v{i}": value for i, value in enumerate(updates.values())}
+            update_expression = "SET " + ", ".join(f"#k{i} = :v{i}" for i in range(len(updates)))
             
             self.sessions_table.update_item(
                 Key={'session_id': session_id},
                 UpdateExpression=update_expression,
+                ExpressionAttributeNames=expression_names,
                 ExpressionAttributeValues=expression_values
             )
             
-            logger.info(f"Updated session {session_id}")
+            logger.info("Updated session %s", session_id)
             
         except Exception as e:
-            logger.error(f"Failed to update session {session_id}: {e}")
+            logger.error("Failed to update session %s: %s", session_id, e)
             raise
     
     def delete_session(self, session_id: str):
         """Delete session from DynamoDB"""
         try:
             self.sessions_table.delete_item(Key={'session_id': session_id})
-            logger.info(f"Deleted session {session_id}")
+            logger.info("Deleted session %s", session_id)
         except Exception as e:
-            logger.error(f"Failed to delete session {session_id}: {e}")
+            logger.error("Failed to delete session %s: %s", session_id, e)
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # 🔧 TEMPLATE MANAGEMENT
@@ -752,66 +1247,107 @@ class TemplateManager:
             }
             
             self.templates_table.put_item(Item=item)
-            logger.info(f"Saved mapping template {template_id}")
+            memory_cache.pop('templates', None)
+            logger.info("Saved mapping template %s", template_id)
             return template_id
             
         except Exception as e:
-            logger.error(f"Failed to save mapping template: {e}")
+            logger.error("Failed to save mapping template: %s", e)
             raise
     
     def get_mapping_templates(self) -> List[Dict[str, Any]]:
         """Get all mapping templates"""
         try:
-            response = self.templates_table.scan()
-            templates = response.get('Items', [])
-            
-            # Convert Decimal to float for JSON serialization
-            templates = safe_decimal_to_float(templates)
-            
-            return templates
+            # Warm containers reuse a recent scan; failed scans are never cached.
+            # Callers get their own copy so mutating it cannot corrupt the cached list
+            return copy.deepcopy(cached('templates', TEMPLATE_LIST_CACHE_TTL, self._scan_mapping_templates))
             
         except Exception as e:
-            logger.error(f"Failed to get mapping templates: {e}")
+            logger.error("Failed to get mapping templates: %s", e)
             return []
     
-    def apply_template(self, template_id: str, client_headers: List[str]) -> Dict[str, Any]:
-        """Apply template mappings to client headers"""
+    def _scan_mapping_templates(self) -> List[Dict[str, Any]]:
+        """Scan every mapping template, following LastEvaluatedKey past the 1 MB page limit"""
+        # Templates store the saved request body as-is, so every attribute is returned
+        scan_kwargs = {}
+        templates = []
+        while True:
+            response = self.templates_table.scan(**scan_kwargs)
+            templates.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                break
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        
+        # Convert Decimal to float for JSON serialization
+        return safe_decimal_to_float(templates)
+    
+    def batch_get(self, template_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get several templates in as few round trips as possible, keyed by template id"""
         try:
-            response = self.templates_table.get_item(Key={'id': template_id})
+            unique_ids = list(dict.fromkeys(template_ids))
+            items = batch_get_items(self.templates_table.name, [{'id': tid} for tid in unique_ids])
+            return {item['id']: item for item in items}
             
-            if 'Item' not in response:
-                raise ValueError(f"Template {template_id} not found")
-            
-            template = response['Item']
+        except Exception as e:
+            logger.error("Failed to batch get templates: %s", e)
+            return {}
+    
+    def apply_template(self, template_id: str, client_headers: List[str],
+                       template: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Apply template mappings to client headers, optionally using an already fetched template item"""
+        try:
+            if template is None:
+                response = self.templates_table.get_item(Key={'id': template_id})
+                
+                if 'Item' not in response:
+                    raise ValueError(f"Template {template_id} not found")
+                
+                template = response['Item']
             mappings = template.get('mappings', {})
             
             applied_mappings = {}
-            total_mapped = 0
             
-            # Apply fuzzy matching for template application
+            # Exact matches first; everything else falls back to fuzzy matching
+            client_header_set = set(client_headers)
             for template_col, original_source in mappings.items():
-                matched_source = None
+                if original_source and original_source in client_header_set:
+                    applied_mappings[template_col] = original_source
+            
+            # Client headers are normalised once; extractOne prunes candidates below the cutoff in C
+            if client_headers:
+                client_lower = [header.lower() for header in client_headers]
+                client_processed = [utils.default_process(header) for header in client_headers]
                 
-                # Try exact match first
-                if original_source in client_headers:
-                    matched_source = original_source
-                else:
-                    # Try fuzzy matching
-                    best_match = None
-                    best_score = 0
+                # Headers equal modulo case and surrounding whitespace resolve without fuzzy scoring
+                normalized_headers = {}
+                for header, lowered in zip(client_headers, client_lower):
+                    key = lowered.strip()
+                    if key:
+                        normalized_headers.setdefault(key, header)
+                
+                for template_col, original_source in mappings.items():
+                    if template_col in applied_mappings:
+                        continue
                     
-                    for client_header in client_headers:
-                        score = fuzz.ratio(original_source.lower(), client_header.lower())
-                        if score > best_score and score > 70:
-                            best_score = score
-                            best_match = client_header
+                    normalized_source = original_source.lower().strip()
+                    if normalized_source in normalized_headers:
+                        applied_mappings[template_col] = normalized_headers[normalized_source]
+                        continue
                     
-                    if best_match:
-                        matched_source = best_match
-                
-                if matched_source:
-                    applied_mappings[template_col] = matched_source
-                    total_mapped += 1
+                    # token_sort_ratio tolerates reordered words; it has no partial component, so a short
+                    # header such as 'Unit' cannot claim a longer one such as 'Unit Price'
+                    match = extractOne(
+                        utils.default_process(original_source), client_processed,
+                        scorer=fuzz.token_sort_ratio, processor=None, score_cutoff=70
+                    )
+                    if match and match[1] > 70:
+                        best_match = client_headers[match[2]]
+                        if best_match:
+                            applied_mappings[template_col] = best_match
+            
+            # Preserve the template's column order in the result
+            applied_mappings = {col: applied_mappings[col] for col in mappings if col in applied_mappings}
+            total_mapped = len(applied_mappings)
             
             # Increment usage count
             self.templates_table.update_item(
@@ -830,7 +1366,7 @@ class TemplateManager:
             }
             
         except Exception as e:
-            logger.error(f"Failed to apply template {template_id}: {e}")
+            logger.error("Failed to apply template %s: %s", template_id, e)
             raise
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -855,14 +1391,13 @@ def upload_handler(event, context):
         
         # Extract files and form data (simplified for demo)
         # In production, use a proper multipart parser
-        form_data = json.loads(body) if isinstance(body, str) else {}
+        form_data = parse_json(body) if isinstance(body, str) else {}
         
         client_file_data = form_data.get('clientFile')
         template_file_data = form_data.get('templateFile')
         
         if not client_file_data or not template_file_data:
             return lambda_response(400, {
-                'success': False,
                 'error': 'Both client and template files are required'
             })
         
@@ -890,13 +1425,27 @@ def upload_handler(event, context):
             'header_row': int(form_data.get('headerRow', 1)),
             'template_sheet_name': form_data.get('templateSheetName'),
             'template_header_row': int(form_data.get('templateHeaderRow', 1)),
-            'formula_rules': json.loads(form_data.get('formulaRules', '[]')),
+            'formula_rules': parse_json(form_data.get('formulaRules', '[]')),
             'status': 'uploaded'
         }
         
-        session_id = session_manager.create_session(session_data)
+        # Parse both header rows while the files are in memory; later handlers read them from the session
+        mapper = AdvancedBOMHeaderMapper()
+        client_headers = mapper.read_excel_headers(
+            client_content,
+            session_data['sheet_name'],
+            session_data['header_row'] - 1,
+            filename=client_name
+        )
+        session_data['client_headers'] = client_headers
+        session_data['template_headers'] = mapper.read_excel_headers(
+            template_content,
+            session_data['template_sheet_name'],
+            session_data['template_header_row'] - 1,
+            filename=template_name
+        )
         
-        # Apply template if specified
+        # Apply template if specified; its mappings are written with the new session in one put
         template_applied = False
         applied_mappings = {}
         use_template_id = form_data.get('useTemplateId')
@@ -904,14 +1453,6 @@ def upload_handler(event, context):
         if use_template_id:
             try:
                 template_manager = TemplateManager()
-                mapper = AdvancedBOMHeaderMapper()
-                
-                # Read client headers
-                client_headers = mapper.read_excel_headers(
-                    client_content,
-                    session_data['sheet_name'],
-                    session_data['header_row'] - 1
-                )
                 
                 # Apply template
                 result = template_manager.apply_template(use_template_id, client_headers)
@@ -920,15 +1461,16 @@ def upload_handler(event, context):
                     template_applied = True
                     applied_mappings = result['mappings']
                     
-                    # Update session with applied mappings
-                    session_manager.update_session(session_id, {
+                    session_data.update({
                         'mappings': result,
                         'template_id': use_template_id,
                         'template_applied': True
                     })
                 
             except Exception as e:
-                logger.error(f"Template application failed: {e}")
+                logger.error("Template application failed: %s", e)
+        
+        session_id = session_manager.create_session(session_data)
         
         return lambda_response(201, {
             'success': True,
@@ -939,10 +1481,8 @@ def upload_handler(event, context):
         })
         
     except Exception as e:
-        logger.error(f"Upload handler error: {e}")
-        logger.error(traceback.format_exc())
+        logger.exception("Upload handler error: %s", e)
         return lambda_response(500, {
-            'success': False,
             'error': f'Upload failed: {str(e)}'
         })
 
@@ -963,29 +1503,33 @@ def headers_handler(event, context):
         
         if not session:
             return lambda_response(404, {
-                'success': False,
                 'error': 'Session not found'
             })
         
-        file_manager = S3FileManager()
-        mapper = AdvancedBOMHeaderMapper()
-        
-        # Get file contents from S3
-        client_content = file_manager.get_file_content(session['client_s3_key'])
-        template_content = file_manager.get_file_content(session['template_s3_key'])
+        # Headers parsed at upload time are stored on the session; an empty list means the
+        # upload-time parse failed, so those sessions re-read the files instead
+        if session.get('client_headers') and session.get('template_headers'):
+            return lambda_response(200, {
+                'success': True,
+                'client_headers': session['client_headers'],
+                'template_headers': session['template_headers']
+            })
         
-        # Read headers
-        client_headers = mapper.read_excel_headers(
-            client_content,
+        # Headers are cached per upload key; both sides load concurrently
+        client_headers_future = s3_pool.submit(
+            get_client_headers_cached,
+            session['client_s3_key'],
             session.get('sheet_name'),
-            session.get('header_row', 1) - 1
+            session.get('header_row', 1) - 1,
+            session.get('client_filename')
         )
-        
-        template_headers = mapper.read_excel_headers(
-            template_content,
+        template_headers = list(get_template_headers_cached(
+            session['template_s3_key'],
             session.get('template_sheet_name'),
-            session.get('template_header_row', 1) - 1
-        )
+            session.get('template_header_row', 1) - 1,
+            session.get('template_filename')
+        ))
+        client_headers = list(client_headers_future.result())
         
         return lambda_response(200, {
             'success': True,
@@ -994,9 +1538,8 @@ def headers_handler(event, context):
         })
         
     except Exception as e:
-        logger.error(f"Headers handler error: {e}")
+        logger.error("Headers handler error: %s", e)
         return lambda_response(500, {
-            'success': False,
             'error': f'Failed to get headers: {str(e)}'
         })
 
@@ -1010,12 +1553,11 @@ def mapping_suggestions_handler(event, context):
         if event.get('httpMethod') == 'OPTIONS':
             return handle_cors_preflight()
         
-        body = json.loads(event.get('body', '{}'))
+        body = parse_json(event.get('body', '{}'))
         session_id = body.get('session_id')
         
         if not session_id:
             return lambda_response(400, {
-                'success': False,
                 'error': 'Session ID is required'
             })
         
@@ -1024,25 +1566,27 @@ def mapping_suggestions_handler(event, context):
         
         if not session:
             return lambda_response(404, {
-                'success': False,
                 'error': 'Session not found'
             })
         
         file_manager = S3FileManager()
         mapper = AdvancedBOMHeaderMapper()
         
-        # Get file contents
+        # Get client content; template headers are cached by upload key
         client_content = file_manager.get_file_content(session['client_s3_key'])
-        template_content = file_manager.get_file_content(session['template_s3_key'])
         
         # Get mapping suggestions
         mapping_results = mapper.map_headers_to_template(
             client_content,
-            template_content,
+            None,
             session.get('sheet_name'),
             session.get('template_sheet_name'),
             session.get('header_row', 1) - 1,
-            session.get('template_header_row', 1) - 1
+            session.get('template_header_row', 1) - 1,
+            client_filename=session.get('client_filename'),
+            template_filename=session.get('template_filename'),
+            template_s3_key=session['template_s3_key'],
+            client_s3_key=session['client_s3_key']
         )
         
         # Prepare AI suggestions
@@ -1055,18 +1599,20 @@ def mapping_suggestions_handler(event, context):
                     'is_specification_mapping': False
                 }
         
-        # Get headers for response
-        client_headers = mapper.read_excel_headers(
-            client_content,
+        # Get headers for response; both were cached while mapping
+        client_headers = list(get_client_headers_cached(
+            session['client_s3_key'],
             session.get('sheet_name'),
-            session.get('header_row', 1) - 1
-        )
+            session.get('header_row', 1) - 1,
+            session.get('client_filename')
+        ))
         
-        template_headers = mapper.read_excel_headers(
-            template_content,
+        template_headers = list(get_template_headers_cached(
+            session['template_s3_key'],
             session.get('template_sheet_name'),
-            session.get('template_header_row', 1) - 1
-        )
+            session.get('template_header_row', 1) - 1,
+            session.get('template_filename')
+        ))
         
         return lambda_response(200, {
             'success': True,
@@ -1080,9 +1626,8 @@ def mapping_suggestions_handler(event, context):
         })
         
     except Exception as e:
-        logger.error(f"Mapping suggestions error: {e}")
+        logger.error("Mapping suggestions error: %s", e)
         return lambda_response(500, {
-            'success': False,
             'error': f'Failed to generate suggestions: {str(e)}'
         })
 
@@ -1096,14 +1641,13 @@ def save_mappings_handler(event, context):
         if event.get('httpMethod') == 'OPTIONS':
             return handle_cors_preflight()
         
-        body = json.loads(event.get('body', '{}'))
+        body = parse_json(event.get('body', '{}'))
         session_id = body.get('session_id')
         mappings = body.get('mappings', {})
         default_values = body.get('default_values', {})
         
         if not session_id:
             return lambda_response(400, {
-                'success': False,
                 'error': 'Session ID is required'
             })
         
@@ -1112,7 +1656,6 @@ def save_mappings_handler(event, context):
         
         if not session:
             return lambda_response(404, {
-                'success': False,
                 'error': 'Session not found'
             })
         
@@ -1129,9 +1672,8 @@ def save_mappings_handler(event, context):
         })
         
     except Exception as e:
-        logger.error(f"Save mappings error: {e}")
+        logger.error("Save mappings error: %s", e)
         return lambda_response(500, {
-            'success': False,
             'error': f'Failed to save mappings: {str(e)}'
         })
 
@@ -1141,6 +1683,8 @@ def save_mappings_handler(event, context):
 
 def data_view_handler(event, context):
     """Get transformed data with applied mappings"""
+    import pandas as pd
+    
     try:
         if event.get('httpMethod') == 'OPTIONS':
             return handle_cors_preflight()
@@ -1152,7 +1696,6 @@ def data_view_handler(event, context):
         
         if not session_id:
             return lambda_response(400, {
-                'success': False,
                 'error': 'Session ID is required'
             })
         
@@ -1161,70 +1704,56 @@ def data_view_handler(event, context):
         
         if not session:
             return lambda_response(400, {
-                'success': False,
                 'error': 'Session not found'
             })
         
         mappings = session.get('mappings')
         if not mappings:
             return lambda_response(400, {
-                'success': False,
                 'error': 'No mappings found'
             })
         
         # Get transformed data
-        file_manager = S3FileManager()
         transformer = DataTransformationEngine()
         
-        client_content = file_manager.get_file_content(session['client_s3_key'])
-        
-        # Apply mappings
+        # Apply mappings to the requested page only; the parsed sheet is cached in /tmp by S3 key
+        start_idx = (page - 1) * page_size
         mapping_result = transformer.apply_column_mappings(
-            client_content,
+            None,
             mappings,
             session.get('sheet_name'),
-            session.get('header_row', 1) - 1
+            session.get('header_row', 1) - 1,
+            filename=session.get('client_filename'),
+            start_row=start_idx,
+            n_rows=page_size,
+            client_s3_key=session['client_s3_key']
         )
         
-        transformed_rows = mapping_result['data']
+        transformed_df = mapping_result['df']
         headers = mapping_result['headers']
+        total_rows = mapping_result['total_rows']
         
         # Apply formula rules if they exist
         formula_rules = session.get('formula_rules', [])
-        if formula_rules and transformed_rows:
-            # Convert to dict format for formula processing
-            dict_rows = []
-            for row_list in transformed_rows:
-                row_dict = {}
-                for i, header in enumerate(headers):
-                    if i < len(row_list):
-                        row_dict[header] = row_list[i]
-                    else:
-                        row_dict[header] = ""
-                dict_rows.append(row_dict)
-            
+        if formula_rules and total_rows:
+            # Formula columns depend only on the rules, so a page past the end still reports them
+            formula_input = transformed_df if not transformed_df.empty else pd.DataFrame([[''] * len(headers)], columns=headers)
             formula_result = transformer.apply_formula_rules(
-                dict_rows, headers, formula_rules
+                formula_input, headers, formula_rules
             )
             
-            transformed_rows = formula_result['data']
+            transformed_df = formula_result['df'].iloc[:len(transformed_df)]
             headers = formula_result['headers']
         
-        # Apply default values
+        # Apply default values to empty cells, one column at a time
         default_values = session.get('default_values', {})
-        if default_values and transformed_rows:
-            for row in transformed_rows:
-                for field_name, default_value in default_values.items():
-                    if field_name in headers:
-                        current_value = row.get(field_name, "")
-                        if not current_value or current_value == "":
-                            row[field_name] = default_value
-        
-        # Implement pagination
-        total_rows = len(transformed_rows)
-        start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
-        paginated_rows = transformed_rows[start_idx:end_idx]
+        if default_values and not transformed_df.empty:
+            for field_name, default_value in default_values.items():
+                if field_name in headers:
+                    column = transformed_df[field_name]
+                    transformed_df[field_name] = column.where(column.astype(bool), default_value)
+        
+        paginated_rows = transformed_df.to_dict('records')
         
         return lambda_response(200, {
             'success': True,
@@ -1240,9 +1769,8 @@ def data_view_handler(event, context):
         })
         
     except Exception as e:
-        logger.error(f"Data view error: {e}")
+        logger.error("Data view error: %s", e)
         return lambda_response(500, {
-            'success': False,
             'error': f'Failed to get data: {str(e)}'
         })
 
@@ -1256,13 +1784,12 @@ def download_handler(event, context):
         if event.get('httpMethod') == 'OPTIONS':
             return handle_cors_preflight()
         
-        body = json.loads(event.get('body', '{}'))
+        body = parse_json(event.get('body', '{}'))
         session_id = body.get('session_id')
         file_format = body.get('format', 'excel')
         
         if not session_id:
             return lambda_response(400, {
-                'success': False,
                 'error': 'Session ID is required'
             })
         
@@ -1271,7 +1798,6 @@ def download_handler(event, context):
         
         if not session:
             return lambda_response(404, {
-                'success': False,
                 'error': 'Session not found'
             })
         
@@ -1279,42 +1805,65 @@ def download_handler(event, context):
         file_manager = S3FileManager()
         transformer = DataTransformationEngine()
         
-        client_content = file_manager.get_file_content(session['client_s3_key'])
         mappings = session.get('mappings', {})
         
         if not mappings:
             return lambda_response(400, {
-                'success': False,
                 'error': 'No mappings found'
             })
         
-        # Apply transformations
+        # Apply transformations; the parsed sheet is cached in /tmp by S3 key
         mapping_result = transformer.apply_column_mappings(
-            client_content,
+            None,
             mappings,
             session.get('sheet_name'),
-            session.get('header_row', 1) - 1
+            session.get('header_row', 1) - 1,
+            filename=session.get('client_filename'),
+            client_s3_key=session['client_s3_key']
         )
         
         # Create Excel or CSV file
-        df = pd.DataFrame(mapping_result['data'], columns=mapping_result['headers'])
+        df = mapping_result['df']
         
         # Generate file content
         if file_format.lower() == 'csv':
-            output = io.StringIO()
-            df.to_csv(output, index=False)
-            file_content = output.getvalue().encode('utf-8')
+            # Plain csv.writer over row tuples; no DataFrame formatting pass needed for an all-string frame
+            output = io.BytesIO()
+            text_output = io.TextIOWrapper(output, encoding='utf-8', newline='')
+            writer = csv.writer(text_output, lineterminator='\n')
+            writer.writerow(df.columns)
+            writer.writerows(df.itertuples(index=False, name=None))
+            text_output.detach()
             filename = f"processed_data_{session_id}.csv"
             content_type = 'text/csv'
         else:
+            # Stream rows instead of keeping every cell object in memory
             output = io.BytesIO()
-            df.to_excel(output, index=False, engine='openpyxl')
-            file_content = output.getvalue()
+            if xlsxwriter is not None:
+                workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'strings_to_urls': False})
+                worksheet = workbook.add_worksheet('Sheet1')
+                worksheet.write_row(0, 0, list(df.columns))
+                for row_index, row in enumerate(df.itertuples(index=False, name=None), start=1):
+                    worksheet.write_row(row_index, 0, row)
+                workbook.close()
+            else:
+                from openpyxl import Workbook
+                
+                workbook = Workbook(write_only=True)
+                worksheet = workbook.create_sheet('Sheet1')
+                worksheet.append(list(df.columns))
+                for row in df.itertuples(index=False, name=None):
+                    worksheet.append(row)
+                workbook.save(output)
             filename = f"processed_data_{session_id}.xlsx"
             content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         
-        # Save to S3 and generate presigned URL
-        s3_key = file_manager.save_processed_file(file_content, filename, session_id)
+        # Release the frame before the upload so only the serialized file stays resident
+        del df, mapping_result
+        
+        # Stream the buffer to S3 and generate presigned URL
+        output.seek(0)
+        s3_key = file_manager.save_processed_file(output, filename, session_id)
         download_url = file_manager.create_presigned_url(s3_key, expiration=3600)
         
         return lambda_response(200, {
@@ -1325,9 +1874,8 @@ def download_handler(event, context):
         })
         
     except Exception as e:
-        logger.error(f"Download handler error: {e}")
+        logger.error("Download handler error: %s", e)
         return lambda_response(500, {
-            'success': False,
             'error': f'Download failed: {str(e)}'
         })
 
@@ -1341,7 +1889,7 @@ def template_save_handler(event, context):
         if event.get('httpMethod') == 'OPTIONS':
             return handle_cors_preflight()
         
-        body = json.loads(event.get('body', '{}'))
+        body = parse_json(event.get('body', '{}'))
         
         template_manager = TemplateManager()
         template_id = template_manager.save_mapping_template(body)
@@ -1353,9 +1901,8 @@ def template_save_handler(event, context):
         })
         
     except Exception as e:
-        logger.error(f"Template save error: {e}")
+        logger.error("Template save error: %s", e)
         return lambda_response(500, {
-            'success': False,
             'error': f'Failed to save template: {str(e)}'
         })
 
@@ -1374,9 +1921,8 @@ def template_list_handler(event, context):
         })
         
     except Exception as e:
-        logger.error(f"Template list error: {e}")
+        logger.error("Template list error: %s", e)
         return lambda_response(500, {
-            'success': False,
             'error': f'Failed to get templates: {str(e)}'
         })
 
@@ -1390,13 +1936,12 @@ def apply_formulas_handler(event, context):
         if event.get('httpMethod') == 'OPTIONS':
             return handle_cors_preflight()
         
-        body = json.loads(event.get('body', '{}'))
+        body = parse_json(event.get('body', '{}'))
         session_id = body.get('session_id')
         formula_rules = body.get('formula_rules', [])
         
         if not session_id:
             return lambda_response(400, {
-                'success': False,
                 'error': 'Session ID is required'
             })
         
@@ -1405,7 +1950,6 @@ def apply_formulas_handler(event, context):
         
         if not session:
             return lambda_response(404, {
-                'success': False,
                 'error': 'Session not found'
             })
         
@@ -1421,9 +1965,8 @@ def apply_formulas_handler(event, context):
         })
         
     except Exception as e:
-        logger.error(f"Apply formulas error: {e}")
+        logger.error("Apply formulas error: %s", e)
         return lambda_response(500, {
-            'success': False,
             'error': f'Failed to apply formulas: {str(e)}'
         })
 
@@ -1433,7 +1976,7 @@ def create_factwise_id_handler(event, context):
         if event.get('httpMethod') == 'OPTIONS':
             return handle_cors_preflight()
         
-        body = json.loads(event.get('body', '{}'))
+        body = parse_json(event.get('body', '{}'))
         session_id = body.get('session_id')
         first_column = body.get('first_column')
         second_column = body.get('second_column')
@@ -1441,7 +1984,6 @@ def create_factwise_id_handler(event, context):
         
         if not all([session_id, first_column, second_column]):
             return lambda_response(400, {
-                'success': False,
                 'error': 'Session ID, first_column, and second_column are required'
             })
         
@@ -1450,7 +1992,6 @@ def create_factwise_id_handler(event, context):
         
         if not session:
             return lambda_response(404, {
-                'success': False,
                 'error': 'Session not found'
             })
         
@@ -1463,12 +2004,16 @@ def create_factwise_id_handler(event, context):
         }
         
         factwise_rules = session.get('factwise_rules', [])
-        factwise_rules = [r for r in factwise_rules if r.get('type') != 'factwise_id']
-        factwise_rules.append(factwise_rule)
-        
-        session_manager.update_session(session_id, {
-            'factwise_rules': factwise_rules
-        })
+        if any(r.get('type') == 'factwise_id' for r in factwise_rules):
+            # Replacing an existing rule needs the filtered list written back
+            factwise_rules = [r for r in factwise_rules if r.get('type') != 'factwise_id']
+            factwise_rules.append(factwise_rule)
+            
+            session_manager.update_session(session_id, {
+                'factwise_rules': factwise_rules
+            })
+        else:
+            session_manager.append_to_session_list(session_id, 'factwise_rules', [factwise_rule])
         
         return lambda_response(200, {
             'success': True,
@@ -1476,9 +2021,8 @@ def create_factwise_id_handler(event, context):
         })
         
     except Exception as e:
-        logger.error(f"Create Factwise ID error: {e}")
+        logger.error("Create Factwise ID error: %s", e)
         return lambda_response(500, {
-            'success': False,
             'error': f'Failed to create Factwise ID: {str(e)}'
         })
 
@@ -1500,7 +2044,7 @@ def health_check_handler(event, context):
         })
         
     except Exception as e:
-        logger.error(f"Health check error: {e}")
+        logger.error("Health check error: %s", e)
         return lambda_response(500, {
             'status': 'unhealthy',
             'error': str(e)
@@ -1510,65 +2054,137 @@ def health_check_handler(event, context):
 # 🎯 MAIN ROUTER FUNCTION (OPTIONAL - FOR SINGLE LAMBDA ARCHITECTURE)
 # ═══════════════════════════════════════════════════════════════════════════════
 
+ROUTE_PARAM = ':param'
+ROUTE_LEAF = ':handlers'
+
+def build_route_trie(definitions: List[Tuple[str, str, Any]]) -> Dict[str, Any]:
+    """Build a segment trie mapping path segments to per-method handlers and parameter names"""
+    trie = {}
+    for method, pattern, handler in definitions:
+        node = trie
+        param_names = []
+        for segment in pattern.strip('/').split('/'):
+            if segment.startswith('{') and segment.endswith('}'):
+                param_names.append(segment[1:-1])
+                segment = ROUTE_PARAM
+            node = node.setdefault(segment, {})
+        node.setdefault(ROUTE_LEAF, {})[method] = (handler, tuple(param_names))
+    return trie
+
+def not_found_handler(event, context):
+    """Answer requests that match no route with the pre-serialized 404"""
+    logger.debug("Endpoint not found: %s %s", event['httpMethod'], event['path'])
+    return dict(NOT_FOUND_RESPONSE)
+
+def match_route(method: str, path: str) -> Tuple[Any, Dict[str, str]]:
+    """Resolve a parameterised path to (handler, path parameters), preferring literal segments over parameters"""
+    node = ROUTE_TRIE
+    values = []
+    for segment in path.strip('/').split('/'):
+        if segment in node:
+            node = node[segment]
+        elif ROUTE_PARAM in node and segment:
+            node = node[ROUTE_PARAM]
+            values.append(segment)
+        else:
+            return not_found_handler, {}
+    
+    handler, param_names = node.get(ROUTE_LEAF, {}).get(method, (not_found_handler, ()))
+    return handler, dict(zip(param_names, values))
+
+def parameterised_route_handler(event, context):
+    """Dispatch paths missing from the static route table through the route trie"""
+    handler, path_params = match_route(event['httpMethod'], event['path'])
+    if path_params:
+        event['pathParameters'] = {**(event.get('pathParameters') or {}), **path_params}
+    return handler(event, context)
+
+def safe_handler(handler):
+    """Wrap a routed handler so unexpected failures are logged and returned as a 500"""
+    @wraps(handler)
+    def wrapper(event, context):
+        try:
+            return handler(event, context)
+        except Exception as e:
+            logger.exception("Router error: %s", e)
+            return dict(INTERNAL_ERROR_RESPONSE)
+    return wrapper
+
 def main_router(event, context):
     """Main router for all Excel Mapper operations"""
+    intern = sys.intern
+    
+    # API Gateway proxy events always carry path and httpMethod
     try:
-        path = event.get('path', '')
-        method = event.get('httpMethod', 'GET')
-        
-        # Route to appropriate handler
-        if path == '/health' and method == 'GET':
-            return health_check_handler(event, context)
-        elif path == '/upload' and method == 'POST':
-            return upload_handler(event, context)
-        elif path.startswith('/headers/') and method == 'GET':
-            return headers_handler(event, context)
-        elif path == '/mapping' and method == 'POST':
-            return mapping_suggestions_handler(event, context)
-        elif path == '/mapping/save' and method == 'POST':
-            return save_mappings_handler(event, context)
-        elif path == '/data' and method == 'GET':
-            return data_view_handler(event, context)
-        elif path == '/download' and method == 'POST':
-            return download_handler(event, context)
-        elif path == '/templates/save' and method == 'POST':
-            return template_save_handler(event, context)
-        elif path == '/templates' and method == 'GET':
-            return template_list_handler(event, context)
-        elif path == '/formulas/apply' and method == 'POST':
-            return apply_formulas_handler(event, context)
-        elif path == '/create-factwise-id' and method == 'POST':
-            return create_factwise_id_handler(event, context)
-        else:
-            return lambda_response(404, {
-                'success': False,
-                'error': f'Endpoint not found: {method} {path}'
-            })
-            
-    except Exception as e:
-        logger.error(f"Router error: {e}")
-        logger.error(traceback.format_exc())
-        return lambda_response(500, {
-            'success': False,
-            'error': 'Internal server error'
-        })
+        path = intern(event['path'])
+        
+        # Keep-warm pings return before any routing work
+        if path == '/ping':
+            return {'statusCode': 200, 'body': ''}
+        
+        method = intern(event['httpMethod'])
+    except (KeyError, TypeError):
+        logger.debug("Malformed request event: %s", event)
+        return dict(BAD_REQUEST_RESPONSE)
+    
+    method_routes = ROUTES.get(method)
+    if method_routes is None:
+        logger.debug("Method not allowed: %s %s", method, path)
+        return dict(METHOD_NOT_ALLOWED_RESPONSE)
+    
+    # Static routes dispatch directly; anything else falls through to the trie.
+    # Routed handlers carry their own error handling
+    return method_routes.get(path, parameterised_route_handler)(event, context)
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # 🚀 EXPORT HANDLERS FOR INDIVIDUAL LAMBDA FUNCTIONS
 # ═══════════════════════════════════════════════════════════════════════════════
 
+# Handler registry: exported as lambda_<name> for separate Lambda functions and used for routing
+_HANDLERS = {
+    'upload': upload_handler,
+    'headers': headers_handler,
+    'mapping_suggestions': mapping_suggestions_handler,
+    'save_mappings': save_mappings_handler,
+    'data_view': data_view_handler,
+    'download': download_handler,
+    'template_save': template_save_handler,
+    'template_list': template_list_handler,
+    'apply_formulas': apply_formulas_handler,
+    'create_factwise_id': create_factwise_id_handler,
+    'health_check': health_check_handler
+}
+
 # Individual handlers for separate Lambda functions
-lambda_upload = upload_handler
-lambda_headers = headers_handler
-lambda_mapping_suggestions = mapping_suggestions_handler
-lambda_save_mappings = save_mappings_handler
-lambda_data_view = data_view_handler
-lambda_download = download_handler
-lambda_template_save = template_save_handler
-lambda_template_list = template_list_handler
-lambda_apply_formulas = apply_formulas_handler
-lambda_create_factwise_id = create_factwise_id_handler
-lambda_health_check = health_check_handler
+globals().update({f'lambda_{name}': handler for name, handler in _HANDLERS.items()})
 
 # Main router for single Lambda architecture
-lambda_main_router = main_router
\ No newline at end of file
+lambda_main_router = main_router
+
+# Route tables for main_router, built once per container and reused by warm invocations;
+# '{name}' segments are path parameters
+ROUTE_DEFINITIONS = [
+    ('GET', '/health', safe_handler(_HANDLERS['health_check'])),
+    ('POST', '/upload', safe_handler(_HANDLERS['upload'])),
+    ('GET', '/headers/{session_id}', safe_handler(_HANDLERS['headers'])),
+    ('POST', '/mapping', safe_handler(_HANDLERS['mapping_suggestions'])),
+    ('POST', '/mapping/save', safe_handler(_HANDLERS['save_mappings'])),
+    ('GET', '/data', safe_handler(_HANDLERS['data_view'])),
+    ('POST', '/download', safe_handler(_HANDLERS['download'])),
+    ('POST', '/templates/save', safe_handler(_HANDLERS['template_save'])),
+    ('GET', '/templates', safe_handler(_HANDLERS['template_list'])),
+    ('POST', '/formulas/apply', safe_handler(_HANDLERS['apply_formulas'])),
+    ('POST', '/create-factwise-id', safe_handler(_HANDLERS['create_factwise_id']))
+]
+
+# Static routes resolve with a method-first dict probe; parameterised ones walk the trie.
+# Keys are interned like the incoming method/path so probes hit the identity check
+ROUTES = {
+    sys.intern(method): {
+        sys.intern(pattern): handler
+        for route_method, pattern, handler in ROUTE_DEFINITIONS
+        if route_method == method and '{' not in pattern
+    }
+    for method in {method for method, _, _ in ROUTE_DEFINITIONS}
+}
+ROUTE_TRIE = build_route_trie(ROUTE_DEFINITIONS)
@@ -0,0 +1,17 @@
+import importlib.util
+import os
+from pathlib import Path
+
+import pytest
+
+LAMBDA_PATH = Path(__file__).resolve().parent.parent / 'lambda.py'
+
+
+@pytest.fixture(scope='session')
+def lambda_module():
+    """Load lambda.py, which cannot be imported by name because 'lambda' is a keyword"""
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    spec = importlib.util.spec_from_file_location('excel_mapper_lambda', LAMBDA_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,43 @@
+import pytest
+
+
+class FakeTemplatesTable:
+    def update_item(self, **kwargs):
+        pass
+
+
+@pytest.fixture
+def template_manager(lambda_module):
+    manager = lambda_module.TemplateManager()
+    manager.templates_table = FakeTemplatesTable()
+    return manager
+
+
+def apply_mappings(template_manager, mappings, client_headers):
+    result = template_manager.apply_template('t1', client_headers, template={'mappings': mappings})
+    return result['mappings']
+
+
+@pytest.mark.parametrize('source, client_headers', [
+    ('Unit', ['Unit Price', 'Quantity']),
+    ('Qty', ['Qty Required', 'Description']),
+    ('Part', ['Part Number', 'Part Description']),
+])
+def test_short_prefix_headers_are_not_remapped(template_manager, source, client_headers):
+    assert apply_mappings(template_manager, {'Target': source}, client_headers) == {}
+
+
+def test_reordered_words_still_match(template_manager):
+    mappings = apply_mappings(template_manager, {'Quantity': 'Qty Required'}, ['Required Qty', 'Unit Price'])
+    
+    assert mappings == {'Quantity': 'Required Qty'}
+
+
+def test_exact_and_case_insensitive_matches_keep_template_order(template_manager):
+    mappings = apply_mappings(
+        template_manager,
+        {'Part Number': 'Part No', 'Quantity': 'qty '},
+        ['QTY', 'Part No']
+    )
+    
+    assert list(mappings.items()) == [('Part Number', 'Part No'), ('Quantity', 'QTY')]
@@ -0,0 +1,52 @@
+import json
+import subprocess
+import sys
+
+from conftest import LAMBDA_PATH
+
+LOAD_LAMBDA = f"""
+import importlib.util, json, sys, threading
+spec = importlib.util.spec_from_file_location('excel_mapper_lambda', {str(LAMBDA_PATH)!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+"""
+
+
+def run_fresh_interpreter(script):
+    """Run script in a new interpreter so pandas has not been imported by the test session"""
+    completed = subprocess.run(
+        [sys.executable, '-c', LOAD_LAMBDA + script],
+        capture_output=True, text=True, check=True,
+        env={'AWS_DEFAULT_REGION': 'us-east-1', 'PATH': ''}
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def test_module_load_and_ping_do_not_import_pandas():
+    result = run_fresh_interpreter("""
+response = module.main_router({'path': '/ping'}, None)
+print(json.dumps([response['statusCode'], 'pandas' in sys.modules, 'numpy' in sys.modules]))
+""")
+    
+    assert result == [200, False, False]
+
+
+def test_first_pandas_use_from_concurrent_threads():
+    result = run_fresh_interpreter("""
+mapper = module.AdvancedBOMHeaderMapper()
+barrier = threading.Barrier(4)
+results = []
+
+def read_headers():
+    barrier.wait()
+    results.append(mapper.read_excel_headers(b'Part,Qty\\nA-1,2\\n', filename='bom.csv'))
+
+threads = [threading.Thread(target=read_headers) for _ in range(4)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+print(json.dumps(results))
+""")
+    
+    assert result == [['Part', 'Qty']] * 4
@@ -0,0 +1,76 @@
+import io
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+
+def build_workbook(rows):
+    workbook = Workbook()
+    worksheet = workbook.active
+    for row in rows:
+        worksheet.append(row)
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+@pytest.fixture
+def mapper(lambda_module):
+    return lambda_module.AdvancedBOMHeaderMapper()
+
+
+@pytest.mark.parametrize('header_row', [0, 1])
+def test_leading_blank_row_counts_towards_header_row(lambda_module, mapper, header_row):
+    content = build_workbook([[None, None], ['Part', 'Qty'], ['A-1', 2], ['A-2', 3]])
+    
+    headers = mapper.read_excel_headers(content, header_row=header_row)
+    frame = lambda_module.DataTransformationEngine()._read_client_frame(content, header_row=header_row)
+    
+    expected = [str(col) for col in pd.read_excel(io.BytesIO(content), header=header_row).columns]
+    assert [str(col) for col in frame.columns] == expected
+    assert headers == expected
+
+
+def test_leading_blank_row_maps_data_under_header_row_one(lambda_module):
+    content = build_workbook([[None, None], ['Part', 'Qty'], ['A-1', 2], ['A-2', 3]])
+    
+    result = lambda_module.DataTransformationEngine().apply_column_mappings(
+        content, {'mappings': [{'source': 'Part', 'target': 'Part Number'}]}, header_row=1
+    )
+    
+    assert result['total_rows'] == 2
+    assert result['df']['Part Number'].tolist() == ['A-1', 'A-2']
+
+
+@pytest.mark.parametrize('cells, data_row', [
+    (['Qty', 'Qty', None, 'Qty.1'], [1, 2, 3, 4]),
+    (['a', 'a', 'a', 'a.1', 'a'], [1, 2, 3, 4, 5]),
+    ([None, 'Unnamed: 0', 'Part', 'Part'], [1, 2, 3, 4]),
+    (['A', None], [1, 2]),
+    (['A', 'B'], [1, 2, 3]),
+    (['Unnamed: 2', 'B'], [1, 2, 3]),
+])
+def test_header_labels_match_read_excel_columns(mapper, cells, data_row):
+    content = build_workbook([cells, data_row])
+    
+    expected = [str(col) for col in pd.read_excel(io.BytesIO(content), header=0).columns]
+    labels = mapper._label_header_cells(cells, len(data_row))
+    
+    assert labels == expected
+    assert len(set(labels)) == len(labels)
+    assert mapper.read_excel_headers(content) == expected
+
+
+def test_empty_sheet_has_no_headers(mapper):
+    assert mapper.read_excel_headers(build_workbook([])) == []
+
+
+def test_sheet_width_scans_rows_when_dimension_is_missing(mapper):
+    from openpyxl import load_workbook
+    
+    content = build_workbook([['A', None], [1, 2, 3, None]])
+    worksheet = load_workbook(io.BytesIO(content), read_only=True).active
+    worksheet.reset_dimensions()
+    
+    assert mapper._sheet_width(worksheet) == 3
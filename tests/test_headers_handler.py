@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def session_headers(lambda_module, monkeypatch):
+    session = {
+        'client_s3_key': 'uploads/client.xlsx',
+        'template_s3_key': 'uploads/template.xlsx',
+        'header_row': 1,
+        'template_header_row': 1
+    }
+    monkeypatch.setattr(lambda_module.SessionManager, 'get_session', lambda self, session_id: session)
+    monkeypatch.setattr(lambda_module, 'get_client_headers_cached', lambda *args: ('Part', 'Qty'))
+    monkeypatch.setattr(lambda_module, 'get_template_headers_cached', lambda *args: ('Part Number', 'Quantity'))
+    return session
+
+
+def get_headers(lambda_module):
+    response = lambda_module.headers_handler({'pathParameters': {'session_id': 's1'}}, None)
+    return json.loads(response['body'])
+
+
+def test_stored_headers_are_returned_without_reading_files(lambda_module, session_headers):
+    session_headers.update(client_headers=['Stored Part'], template_headers=['Stored Target'])
+    
+    body = get_headers(lambda_module)
+    
+    assert body['client_headers'] == ['Stored Part']
+    assert body['template_headers'] == ['Stored Target']
+
+
+@pytest.mark.parametrize('client_headers, template_headers', [
+    ([], ['Stored Target']),
+    (['Stored Part'], []),
+    ([], []),
+])
+def test_empty_stored_headers_fall_back_to_the_files(lambda_module, session_headers,
+                                                     client_headers, template_headers):
+    session_headers.update(client_headers=client_headers, template_headers=template_headers)
+    
+    body = get_headers(lambda_module)
+    
+    assert body['client_headers'] == ['Part', 'Qty']
+    assert body['template_headers'] == ['Part Number', 'Quantity']
@@ -0,0 +1,19 @@
+def test_template_list_callers_cannot_mutate_cached_list(lambda_module, monkeypatch):
+    scans = []
+    
+    def scan(self):
+        scans.append(1)
+        return [{'id': 't1', 'mappings': {'Part': 'Part Number'}}]
+    
+    monkeypatch.setattr(lambda_module.TemplateManager, '_scan_mapping_templates', scan)
+    lambda_module.memory_cache.pop('templates', None)
+    manager = lambda_module.TemplateManager()
+    
+    first = manager.get_mapping_templates()
+    first[0]['mappings']['Qty'] = 'Quantity'
+    first.append({'id': 'injected'})
+    second = manager.get_mapping_templates()
+    
+    assert len(scans) == 1
+    assert second == [{'id': 't1', 'mappings': {'Part': 'Part Number'}}]
+    lambda_module.memory_cache.pop('templates', None)
@@ -0,0 +1,41 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+
+@pytest.fixture
+def templates_table(lambda_module, monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    with mock_aws():
+        table = boto3.resource('dynamodb', region_name='us-east-1').create_table(
+            TableName='ExcelMapper_Templates',
+            KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'id', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        monkeypatch.setattr(lambda_module, 'templates_table', table)
+        lambda_module.memory_cache.pop('templates', None)
+        yield table
+        lambda_module.memory_cache.pop('templates', None)
+
+
+def test_saved_template_is_listed_with_every_attribute(lambda_module, templates_table):
+    body = {
+        'session_id': 'session-1',
+        'template_name': 'Supplier BOM',
+        'description': 'Template with 0 tag rules',
+        'mappings': {'Part Number': 'Part No'},
+        'factwise_id_rule': {'firstColumn': 'Part Number'}
+    }
+    
+    save_response = lambda_module.template_save_handler(
+        {'httpMethod': 'POST', 'body': lambda_module.json.dumps(body)}, None
+    )
+    list_response = lambda_module.template_list_handler({'httpMethod': 'GET'}, None)
+    
+    template_id = lambda_module.json.loads(save_response['body'])['template_id']
+    templates = lambda_module.json.loads(list_response['body'])['templates']
+    assert len(templates) == 1
+    assert templates[0]['id'] == template_id
+    assert {key: templates[0][key] for key in body} == body